@@ -5,25 +5,98 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 import zipfile
+import errno
 import subprocess
 import sys
 import shutil
+import struct
 import os
 import tempfile
+import hashlib
+import io
+import json
+import mmap
+import re
+import threading
+import time
+import types
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from PySide6 import QtCore
 
+try:  # opcional: ISA-L (pip install isal) comprime/descomprime deflate 2-4x más rápido que zlib
+    from isal import isal_zlib as _zlib_fast
+except ImportError:
+    _zlib_fast = None
+else:
+
+    class _IsalInflate:
+        """decompressobj de ISA-L que, como el de zlib, falla con zlib.error ante datos corruptos."""
+
+        __slots__ = ("_d",)
+
+        def __init__(self, *args):
+            self._d = _zlib_fast.decompressobj(*args)
+
+        def decompress(self, data, max_length=0):
+            try:
+                return self._d.decompress(data, max_length)
+            except _zlib_fast.error as e:
+                raise zlib.error(str(e)) from e
+
+        def flush(self, *args):
+            try:
+                return self._d.flush(*args)
+            except _zlib_fast.error as e:
+                raise zlib.error(str(e)) from e
+
+        @property
+        def eof(self):
+            return self._d.eof
+
+        @property
+        def unconsumed_tail(self):
+            return self._d.unconsumed_tail
+
+        @property
+        def unused_data(self):
+            return self._d.unused_data
+
+    # zipfile sólo infla con ISA-L (el crc32 lo enlaza al importarse y sigue siendo el de zlib);
+    # la compresión de zipfile también sigue en zlib
+    zipfile.zlib = types.SimpleNamespace(**{**vars(zlib), "decompressobj": _IsalInflate})
+
+try:  # opcional (Linux): escrituras de la extracción por io_uring (pip install liburing)
+    import liburing as _uring
+
+    _uring.Ring, _uring.Cqe  # API actual del paquete; versiones antiguas no se usan
+except (ImportError, AttributeError):
+    _uring = None
+
+PYINSTALLER_REQ = "pyinstaller"  # forma parte de la clave de la plantilla de venv
+
 
 @dataclass
 class BuildOptions:
     noconsole: bool = False
     icon_path: str | None = None  # .ico opcional
+    cache_dir: Path | None = None  # raíz de cachés persistentes (None = temp del sistema)
+    compresslevel: int = 1  # deflate del zip de salida (1 = rápido, 9 = máximo; ≤3 usa ISA-L si está `isal`)
+    onefile: bool = False  # --onefile en lugar de ONEDIR (ignorado si hay pyinstaller.spec)
+    produce_dir: bool = True  # dejar la carpeta <nombre>_onedir
+    produce_zip: bool = True  # dejar <nombre>_onedir.zip
+    jobs: int | None = None  # hilos para extraer/comprimir (None = min(8, núcleos))
+    use_pugz: bool = False  # probar pugz con los miembros enormes (sólo rinde con texto ASCII)
+    parallel_member_threshold: int = 64 << 20  # miembros ≥ esto van a pugz si use_pugz y está en PATH
+    use_uring: bool = sys.platform.startswith("linux")  # io_uring al extraer si hay `liburing`
+    smoke_test: bool = False  # ejecutar el binario generado (--version) y registrar su arranque
 
 
 class BuildSignals(QtCore.QObject):
-    log = QtCore.Signal(str)
     progress = QtCore.Signal(int)
-    done = QtCore.Signal(bool, str, str)  # ok, out_dir_or_zip, error
+    done = QtCore.Signal(bool, object, str)  # ok, Path de salida (carpeta o zip) | None, error
 
 
 def _emit(log_cb, msg: str):
@@ -34,42 +107,829 @@ def _emit(log_cb, msg: str):
         print(msg, flush=True)
 
 
+# Variables que pip/PyInstaller necesitan en Windows; el resto del entorno no se hereda
+_WIN_ENV_KEEP = {
+    "PATH", "PATHEXT", "SYSTEMROOT", "SYSTEMDRIVE", "WINDIR", "COMSPEC",
+    "TEMP", "TMP", "USERPROFILE", "APPDATA", "LOCALAPPDATA", "PROGRAMDATA",
+    "PROCESSOR_ARCHITECTURE", "NUMBER_OF_PROCESSORS",
+    "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "REQUESTS_CA_BUNDLE", "SSL_CERT_FILE",
+}
+
+
+def _child_env(env: dict | None, exe: str | None = None) -> dict | None:
+    """
+    En Windows reduce el entorno del hijo a lo imprescindible (+ PIP_*), antepone la
+    carpeta del ejecutable al PATH y fuerza PYTHONUTF8. En otros OS no toca nada.
+    """
+    if os.name != "nt":
+        return env
+    src = os.environ if env is None else env
+    out = {k: v for k, v in src.items() if k.upper() in _WIN_ENV_KEEP or k.upper().startswith("PIP_")}
+    if exe and os.path.isabs(exe):
+        out["PATH"] = os.path.dirname(exe) + os.pathsep + out.get("PATH", "")
+    out["PYTHONUTF8"] = "1"
+    return out
+
+
+def _popen_kwargs() -> dict:
+    """En Windows: hijos sin consola propia ni parpadeo de ventana."""
+    if os.name != "nt":
+        return {}
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    si.wShowWindow = 0  # SW_HIDE
+    return {"creationflags": subprocess.CREATE_NO_WINDOW, "startupinfo": si}
+
+
+def _iter_lines(fd: int):
+    """Lee un fd en bloques binarios de 64 KiB y devuelve líneas decodificadas (utf-8)."""
+    buf = b""
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", "replace").rstrip()
+    if buf:
+        yield buf.decode("utf-8", "replace").rstrip()
+
+
 def _run(cmd: list[str], cwd: Path | None, env: dict | None, log_cb) -> int:
     _emit(log_cb, f"$ {' '.join(cmd)}")
     proc = subprocess.Popen(
         cmd,
         cwd=str(cwd) if cwd else None,
-        env=env,
+        env=_child_env(env, cmd[0]),
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
+        bufsize=0,
+        **_popen_kwargs(),
     )
-    for line in proc.stdout:
-        _emit(log_cb, line.rstrip())
-    return proc.wait()
+    for line in _iter_lines(proc.stdout.fileno()):
+        _emit(log_cb, line)
+    code = proc.wait()
+    proc.stdout.close()
+    return code
+
+
+# Script que corre DENTRO del venv: recibe órdenes JSON por stdin (una por línea),
+# ejecuta pip / PyInstaller en el mismo proceso y marca el fin con una línea centinela.
+_RPC_DONE = "@@__builder_rpc_done__@@"
+_RPC_SCRIPT = f"""\
+import importlib, json, os, site, sys, traceback
+for raw in sys.stdin:
+    req = json.loads(raw)
+    code = 0
+    try:
+        os.chdir(req.get("cwd") or os.getcwd())
+        importlib.invalidate_caches()
+        for d in site.getsitepackages():
+            site.addsitedir(d)  # procesa .pth de paquetes recién instalados
+        if req["tool"] == "pip":
+            from pip._internal.cli.main import main
+            code = main(req["args"])
+        else:
+            import PyInstaller.__main__
+            PyInstaller.__main__.run(req["args"])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Salto previo: si la herramienta dejó una línea sin terminar, el centinela no se pega a ella
+    sys.stdout.write("\\n{_RPC_DONE} %d\\n" % (code or 0))
+    sys.stdout.flush()
+"""
+
+
+class _VenvRunner:
+    """
+    Python del venv vivo entre llamadas: pip y PyInstaller se ejecutan por RPC (JSON por
+    stdin) dentro del intérprete del venv. close() lo termina; la siguiente call() arranca
+    uno nuevo (necesario entre pip y PyInstaller, ver _prepare_venv).
+    """
+
+    def __init__(self, pybin: Path, script: Path, env: dict | None, log_cb):
+        self.pybin = pybin
+        self.script = script
+        self.env = env
+        self.log_cb = log_cb
+        self._proc: subprocess.Popen | None = None
+        self._lines = None
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [str(self.pybin), "-u", str(self.script)],
+            env=_child_env(self.env, str(self.pybin)),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+            **_popen_kwargs(),
+        )
+        self._lines = _iter_lines(self._proc.stdout.fileno())
+
+    def call(self, tool: str, args: list[str], cwd: Path | None = None) -> int:
+        _emit(self.log_cb, f"$ [{tool}] {' '.join(args)}")
+        if self._proc is None:
+            self._start()
+        req = {"tool": tool, "args": args, "cwd": str(cwd) if cwd else None}
+        try:
+            self._proc.stdin.write((json.dumps(req) + "\n").encode("utf-8"))
+            self._proc.stdin.flush()
+        except OSError:
+            self.close()
+            return 1
+        held = False  # línea vacía retenida: puede ser el salto que precede al centinela
+        for line in self._lines:
+            if line.startswith(_RPC_DONE):
+                return int(line.split()[-1])
+            if held:
+                _emit(self.log_cb, "")
+            held = not line
+            if line:
+                _emit(self.log_cb, line)
+        # El proceso murió sin responder: se relanza en la próxima llamada
+        self.close()
+        return 1
+
+    def close(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._proc.wait()
+        self._proc.stdout.close()
+        self._proc = None
+        self._lines = None
+
+
+def _venv_runner(pybin: Path, opts: BuildOptions, log_cb) -> _VenvRunner:
+    script = _cache_root(opts) / "venv_rpc.py"
+    if not script.exists() or script.read_text(encoding="utf-8") != _RPC_SCRIPT:
+        script.write_text(_RPC_SCRIPT, encoding="utf-8")
+    return _VenvRunner(pybin, script, _pip_env(opts), log_cb)
+
+
+_BAD_ZIP_PATH = re.compile(r"(^|[\\/])\.\.([\\/]|$)")  # componente ".." en cualquier posición
+_WIN_BAD_CHARS = str.maketrans(':<>|"?*', "_______")  # como zipfile._sanitize_windows_name
+_COPY_BUF = 1 << 20  # 1 MiB: buffer de lectura/escritura al extraer
+_SMALL_MEMBER = 64 << 10  # mediana por debajo de esto → agrupar miembros por tarea
+_CHUNK_BYTES = 4 << 20  # tamaño objetivo de cada grupo (~4 MiB)
+_ZIP_STREAM_BYTES = 64 << 20  # al comprimir, archivos mayores no se cargan enteros en memoria
+_ZIP_INFLIGHT_BYTES = 128 << 20  # al comprimir, bytes crudos en vuelo (pico ≈ 2x: crudo + comprimido)
+# Ya comprimidos (el .pyz de PyInstaller incluido): se guardan sin deflate
+_STORED_EXTS = (
+    ".pyz", ".zip", ".whl", ".gz", ".bz2", ".xz", ".7z",
+    ".png", ".jpg", ".jpeg", ".webp", ".woff2", ".mp3", ".mp4",
+)
+
+
+def _extract_chunks(files: list[zipfile.ZipInfo]) -> list[list[zipfile.ZipInfo]]:
+    """Un miembro por tarea; si la mayoría son pequeños, grupos de ~4 MiB."""
+    if not files:
+        return []
+    sizes = sorted(m.file_size for m in files)
+    if sizes[len(sizes) // 2] >= _SMALL_MEMBER:
+        return [[m] for m in files]
+    chunks: list[list[zipfile.ZipInfo]] = [[]]
+    acc = 0
+    for m in files:
+        if chunks[-1] and acc + m.file_size > _CHUNK_BYTES:
+            chunks.append([])
+            acc = 0
+        chunks[-1].append(m)
+        acc += m.file_size
+    return chunks
+
+
+def _fast_rmtree(path: Path, background: bool = False):
+    """
+    Borrado recursivo delegado al SO (rm -rf / rmdir /S /Q), mucho más rápido que
+    shutil.rmtree en venvs con decenas de miles de archivos. Si falla, shutil.rmtree.
+    background=True lo renombra a un nombre único (la ruta queda libre al instante para
+    reutilizarla) y lo borra en un hilo daemon para no bloquear al llamador.
+    """
+    if background:
+        trash = Path(f"{path}.del-{os.getpid()}-{time.monotonic_ns()}")
+        try:
+            os.rename(path, trash)
+        except FileNotFoundError:
+            return
+        except OSError:
+            trash = path  # no se pudo apartar: se borra en su sitio
+        threading.Thread(target=_fast_rmtree, args=(trash,), daemon=True).start()
+        return
+    if not os.path.lexists(path):
+        return
+    if os.name == "nt":
+        cmd = ["cmd", "/c", "rmdir", "/S", "/Q", str(path)]
+    else:
+        cmd = ["rm", "-rf", str(path)]
+    try:
+        subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            **_popen_kwargs(),
+        )
+    except OSError:
+        pass
+    if os.path.lexists(path):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class _MmapFile(io.RawIOBase):
+    """Vista de sólo lectura sobre un mmap con cursor propio (zipfile necesita seekable())."""
+
+    def __init__(self, mm: mmap.mmap):
+        super().__init__()
+        self._mm = mm
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mm)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        data = self._mm[self._pos : self._pos + len(b)]
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+
+_URING_MAX_BATCH = 128  # archivos (write + close) por envío como máximo
+
+
+def _uring_batch(workers: int) -> int:
+    """Archivos por lote y anillo: entre todos los hilos, como mucho 1/4 del límite de fds abiertos."""
+    try:
+        import resource
+
+        soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if soft == resource.RLIM_INFINITY:
+            soft = 1 << 16
+    except (ImportError, OSError, ValueError):
+        soft = 1024
+    return max(1, min(_URING_MAX_BATCH, soft // 4 // max(1, workers)))
+
+
+class _UringWriter:
+    """
+    Escritura de archivos pequeños por lotes con io_uring: al vaciar el lote se abren los
+    archivos y su write + close van encadenados (IOSQE_IO_LINK); un envío por lote en lugar
+    de dos syscalls por archivo. Un anillo por hilo de extracción.
+    Si algo del anillo falla (binding distinto, io_uring deshabilitado…), el lote y los
+    siguientes se escriben con open/write normales.
+    """
+
+    def __init__(self, batch: int):
+        self._batch = batch
+        self._ring = _uring.Ring()
+        self._cqe = _uring.Cqe()
+        _uring.io_uring_queue_init(2 * batch, self._ring)
+        self._pending: list[tuple[Path, bytes]] = []
+        self._ok = True
+        try:
+            self._nbytes_arg = self._probe_write()
+        except BaseException:
+            _uring.io_uring_queue_exit(self._ring)
+            raise
+
+    def _complete(self, n: int) -> dict[int, int]:
+        _uring.io_uring_submit_and_wait(self._ring, n)
+        res: dict[int, int] = {}
+        for _ in range(n):
+            _uring.io_uring_wait_cqe(self._ring, self._cqe)
+            cqe = self._cqe[0]
+            res[_uring.io_uring_cqe_get_data64(cqe)] = cqe.res
+            _uring.io_uring_cqe_seen(self._ring, cqe)
+        return res
+
+    def _prep_write(self, sqe, fd: int, data: bytes):
+        if self._nbytes_arg:
+            _uring.io_uring_prep_write(sqe, fd, data, len(data), 0)  # firma C: buf, nbytes, offset
+        else:
+            _uring.io_uring_prep_write(sqe, fd, data, 0)  # bindings que toman buf, offset
+
+    def _probe_write(self) -> bool:
+        """
+        Averigua qué firma de io_uring_prep_write tiene la versión instalada de liburing
+        escribiendo 2 bytes en un temporal y leyéndolos de vuelta.
+        """
+        with tempfile.TemporaryFile() as f:
+            fd = f.fileno()
+            for nbytes_arg in (True, False):
+                self._nbytes_arg = nbytes_arg
+                os.ftruncate(fd, 0)
+                sqe = _uring.io_uring_get_sqe(self._ring)
+                try:
+                    self._prep_write(sqe, fd, b"ok")
+                except TypeError:
+                    _uring.io_uring_prep_nop(sqe)  # el sqe ya está tomado: se consume vacío
+                    self._complete(1)
+                    continue
+                _uring.io_uring_sqe_set_data64(sqe, 0)
+                if self._complete(1).get(0) == 2 and os.pread(fd, 8, 0) == b"ok":
+                    return nbytes_arg
+        raise OSError(errno.ENOTSUP, "io_uring_prep_write: firma de liburing no reconocida")
+
+    def write(self, path: Path, data: bytes):
+        self._pending.append((path, data))
+        if len(self._pending) >= self._batch:
+            self.flush()
+
+    def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        if self._ok:
+            try:
+                self._submit(batch)
+                return
+            except Exception:
+                # El anillo queda sin usar (close() lo libera); la vía normal reescribe el lote
+                # completo y, si el fallo era real (disco lleno…), lo reporta ella
+                self._ok = False
+        for path, data in batch:
+            with open(path, "wb", buffering=0) as f:
+                f.write(data)
+
+    def _submit(self, batch: list[tuple[Path, bytes]]):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0)
+        fds: list[int] = []
+        submitted = False
+        try:
+            for path, _ in batch:
+                fds.append(os.open(path, flags, 0o666))
+            for i, (fd, (_, data)) in enumerate(zip(fds, batch)):
+                sqe = _uring.io_uring_get_sqe(self._ring)
+                self._prep_write(sqe, fd, data)
+                _uring.io_uring_sqe_set_flags(sqe, _uring.IOSQE_IO_LINK)
+                _uring.io_uring_sqe_set_data64(sqe, 2 * i)
+                sqe = _uring.io_uring_get_sqe(self._ring)
+                _uring.io_uring_prep_close(sqe, fd)
+                _uring.io_uring_sqe_set_data64(sqe, 2 * i + 1)
+            submitted = True
+            res = self._complete(2 * len(batch))
+        finally:
+            if not submitted:
+                for fd in fds:
+                    os.close(fd)
+
+        err = None
+        for i, (fd, (_, data)) in enumerate(zip(fds, batch)):
+            if res.get(2 * i + 1) == -errno.ECANCELED:
+                os.close(fd)  # el write falló y canceló el close encadenado
+            written = res.get(2 * i, -errno.EIO)
+            if written != len(data) and err is None:
+                code = -written if written < 0 else errno.ENOSPC
+                err = OSError(code, f"io_uring: escritura incompleta ({os.strerror(code)})")
+        if err:
+            raise err
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            _uring.io_uring_queue_exit(self._ring)
+
+
+def _pugz_extract(z: zipfile.ZipFile, m: zipfile.ZipInfo, target: Path, jobs: int, log_cb) -> bool:
+    """
+    Descomprime un miembro deflate enorme con pugz (inflate paralelo de un solo stream).
+    El payload crudo se envuelve en cabecera/cola gzip (CRC e ISIZE salen del ZipInfo)
+    y el resultado se verifica por CRC. Devuelve False si no se pudo (→ vía normal).
+    """
+    tool = shutil.which("pugz")
+    if not tool or m.compress_type != zipfile.ZIP_DEFLATED or m.flag_bits & 0x1:
+        return False
+    gz = target.with_name(target.name + ".pugz.gz")
+    try:
+        fp = z.fp
+        fp.seek(m.header_offset)
+        fh = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+        fp.seek(fh[zipfile._FH_FILENAME_LENGTH] + fh[zipfile._FH_EXTRA_FIELD_LENGTH], io.SEEK_CUR)
+        with open(gz, "wb") as out:
+            out.write(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff")
+            left = m.compress_size
+            while left:
+                chunk = fp.read(min(_COPY_BUF, left))
+                if not chunk:
+                    return False
+                out.write(chunk)
+                left -= len(chunk)
+            out.write(struct.pack("<II", m.CRC, m.file_size & 0xFFFFFFFF))
+        with open(target, "wb") as dst:
+            code = subprocess.run(
+                [tool, "-t", str(jobs), str(gz)], stdout=dst, stderr=subprocess.DEVNULL, **_popen_kwargs()
+            ).returncode
+        if code != 0:
+            return False
+        crc = 0
+        with open(target, "rb") as f:
+            while chunk := f.read(_COPY_BUF):
+                crc = zlib.crc32(chunk, crc)
+        if crc != m.CRC:
+            return False
+        _emit(log_cb, f"pugz: {m.filename} ({m.file_size >> 20} MiB)")
+        return True
+    except (OSError, struct.error):
+        return False
+    finally:
+        try:
+            os.unlink(gz)
+        except OSError:
+            pass
+
+
+def _safe_unzip(
+    zip_file: Path,
+    dest: Path,
+    jobs: int | None = None,
+    big_member: int | None = None,
+    log_cb=None,
+    uring: bool = False,
+):
+    # El ZIP se mapea en memoria una vez y cada hilo lo lee con su propio cursor:
+    # el kernel hace readahead mientras los hilos descomprimen y no hay seeks compartidos.
+    fd = os.open(zip_file, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mm = None  # p.ej. archivo vacío: que zipfile dé el error habitual
+
+        def _open_zip() -> zipfile.ZipFile:
+            return zipfile.ZipFile(_MmapFile(mm) if mm is not None else zip_file)
+
+        try:
+            with _open_zip() as z:
+                infos = z.infolist()
+            _extract_members(_open_zip, infos, dest, jobs, big_member, log_cb, uring)
+        finally:
+            if mm is not None:
+                mm.close()
+    finally:
+        os.close(fd)
+
+
+def _member_relpath(name: str) -> str:
+    """
+    Ruta relativa de un miembro en disco. En Windows se sanea como hacía extractall:
+    ':<>|"?*' → '_' (sin esto, 'a:b' crearía un stream NTFS alternativo) y sin puntos ni
+    espacios finales por componente. Fuera de Windows, el nombre tal cual.
+    """
+    if os.name != "nt":
+        return name
+    parts = (p.translate(_WIN_BAD_CHARS).rstrip(". ") for p in re.split(r"[\\/]", name))
+    return "/".join(p for p in parts if p)
+
+
+def _extract_members(
+    open_zip,
+    infos: list[zipfile.ZipInfo],
+    dest: Path,
+    jobs: int | None,
+    big_member: int | None,
+    log_cb,
+    uring: bool = False,
+):
+    # Una sola pasada por el directorio central: validar, recoger carpetas y archivos.
+    # Nada se escribe hasta haber validado TODAS las rutas.
+    dirs = {dest}
+    by_target: dict[Path, zipfile.ZipInfo] = {}  # ruta en disco → miembro (gana el último)
+    targets: dict[str, Path] = {}  # nombre en el ZIP → ruta en disco
+    for m in infos:
+        name = m.filename
+        if (
+            name.startswith(("/", "\\"))
+            or ":" in name[:3]
+            or "\x00" in name
+            or _BAD_ZIP_PATH.search(name)
+        ):
+            raise ValueError(f"Ruta peligrosa en ZIP: {name}")
+        rel = _member_relpath(name)
+        if not rel:
+            continue  # sólo componentes vacíos tras sanear
+        target = targets[name] = dest / rel
+        if m.is_dir():
+            dirs.add(target)
+        else:
+            dirs.add(target.parent)
+            # Nombres repetidos (o que coinciden tras sanear en Windows) irían a la misma ruta
+            # desde hilos distintos; como zipfile, se queda la última entrada
+            by_target.pop(target, None)
+            by_target[target] = m
+    files = list(by_target.values())
+    for d in sorted(dirs):
+        d.mkdir(parents=True, exist_ok=True)
+
+    # ZipFile no es thread-safe: cada hilo abre su propio handle (y su anillo) y lo reutiliza
+    local = threading.local()
+    handles: list[zipfile.ZipFile] = []
+    rings: list[_UringWriter] = []
+    handles_lock = threading.Lock()
+    uring = uring and _uring is not None
+
+    def _writer() -> _UringWriter | None:
+        w = getattr(local, "uring", None)
+        if w is None:
+            try:
+                w = _UringWriter(batch)
+            except Exception:
+                w = False  # io_uring deshabilitado o binding incompatible: escritura normal
+            else:
+                with handles_lock:
+                    rings.append(w)
+            local.uring = w
+        return w or None
+
+    def _handle() -> zipfile.ZipFile:
+        z = getattr(local, "zf", None)
+        if z is None:
+            z = local.zf = open_zip()
+            with handles_lock:
+                handles.append(z)
+        return z
+
+    def _extract_chunk(chunk: list[zipfile.ZipInfo]):
+        z = _handle()
+        w = _writer() if uring else None
+        for m in chunk:
+            if w is not None and m.file_size <= _CHUNK_BYTES:
+                w.write(targets[m.filename], z.read(m))
+                continue
+            with z.open(m) as src, open(targets[m.filename], "wb", buffering=0) as dst:
+                shutil.copyfileobj(io.BufferedReader(src, _COPY_BUF), dst, _COPY_BUF)
+        if w is not None:
+            w.flush()  # el grupo queda en disco al terminar la tarea
+
+    workers = jobs or min(8, os.cpu_count() or 4)
+    batch = _uring_batch(workers) if uring else 0
+
+    # Miembros enormes: un solo stream deflate no se reparte entre hilos → pugz (si se pidió).
+    # Cada uno es una tarea más del pool (las primeras en salir) y, si pugz no puede, esa misma
+    # tarea lo extrae por la vía normal: no hay pasada en serie antes del resto.
+    big: list[zipfile.ZipInfo] = []
+    if big_member and shutil.which("pugz"):
+        big = [m for m in files if m.file_size >= big_member]
+        files = [m for m in files if m.file_size < big_member]
+
+    def _extract_big(m: zipfile.ZipInfo):
+        if not _pugz_extract(_handle(), m, targets[m.filename], workers, log_cb):
+            _extract_chunk([m])
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futures = [ex.submit(_extract_big, m) for m in big]
+            futures += [ex.submit(_extract_chunk, c) for c in _extract_chunks(files)]
+            for f in futures:
+                f.result()
+    finally:
+        for z in handles:
+            z.close()
+        for w in rings:
+            w.close()
+
+    # Fechas del ZIP en los archivos (extractall no las restaura): entre builds del mismo ZIP
+    # PyInstaller no ve como cambiadas fuentes que no cambiaron
+    for m in big + files:
+        try:
+            t = time.mktime(m.date_time + (0, 0, -1))
+            os.utime(targets[m.filename], (t, t))
+        except (OverflowError, ValueError, OSError):
+            pass
+
+
+def _cache_root(opts: BuildOptions) -> Path:
+    root = Path(opts.cache_dir) if opts.cache_dir else Path(tempfile.gettempdir()) / "compilador_cache"
+    root.mkdir(parents=True, exist_ok=True)
+    return root
 
 
-def _safe_unzip(zip_file: Path, dest: Path):
-    with zipfile.ZipFile(zip_file) as z:
-        for m in z.infolist():
-            p = Path(m.filename)
-            if p.is_absolute() or ".." in p.parts:
-                raise ValueError(f"Ruta peligrosa en ZIP: {m.filename}")
-        z.extractall(dest)
+def _best_tmp_base() -> str:
+    """
+    Carpeta base para los temporales del build (proyecto, venv, dist): BUILDER_TEMP si
+    está definida (p. ej. un tmpfs en el mismo dispositivo que la caché, para que el venv
+    plantilla se siga enlazando con hardlinks), si no tempfile.gettempdir().
+    """
+    env = os.environ.get("BUILDER_TEMP")
+    if env and os.path.isdir(env):
+        return env
+    return tempfile.gettempdir()
+
+
+_PYI_CACHE_KEEP = 8  # workpaths de PyInstaller conservados (los usados más recientemente)
+
+
+def _pyi_workpath(proj: Path, names: set[str], opts: BuildOptions, identity: Path) -> Path:
+    """
+    Workpath persistente de PyInstaller. Se conserva entre ejecuciones para que
+    reutilice Analysis-*.toc / PYZ-*.pyz; la clave es el proyecto (identity: su carpeta,
+    o el ZIP de origen) más requirements, icono y datos añadidos. app.py no entra:
+    PyInstaller ya detecta los cambios de fuentes por su cuenta. names = _project_files(proj).
+    """
+    h = hashlib.sha256(str(identity.resolve()).encode("utf-8"))
+    h.update(b"\0")
+    for name in ("requirements.txt", "build_add_data.txt"):
+        h.update((proj / name).read_bytes() if name in names else b"")
+        h.update(b"\0")
+    h.update((opts.icon_path or "").encode("utf-8"))
+    work = _cache_root(opts) / "pyi_cache" / h.hexdigest()[:16]
+    work.mkdir(parents=True, exist_ok=True)
+    os.utime(work)  # mtime = último uso, para el desalojo
+    _prune_pyi_cache(work.parent, _PYI_CACHE_KEEP)
+    return work
+
+
+def _prune_pyi_cache(root: Path, keep: int):
+    """Borra (en segundo plano) los workpaths más allá de los `keep` usados más recientemente."""
+    try:
+        with os.scandir(root) as it:
+            entries = [(e.stat().st_mtime_ns, e.path) for e in it if e.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        _fast_rmtree(Path(path), background=True)
+
+
+def _pip_env(opts: BuildOptions) -> dict:
+    env = dict(os.environ)
+    env["PIP_CACHE_DIR"] = str(_cache_root(opts) / "pip-cache")
+    return env
+
+
+def _venv_key(proj: Path) -> str:
+    """
+    Hash de requirements.txt + PyInstaller + plataforma. Sus 16 primeros caracteres
+    nombran la plantilla; entero es el marcador .reqs_hash que la valida.
+    """
+    req = proj / "requirements.txt"
+    h = hashlib.sha256(req.read_bytes() if req.exists() else b"")
+    h.update(PYINSTALLER_REQ.encode())
+    h.update(sys.platform.encode())
+    return h.hexdigest()
+
+
+def _venv_cfg(venv_dir: Path) -> dict[str, str]:
+    cfg = {}
+    try:
+        for line in (venv_dir / "pyvenv.cfg").read_text(encoding="utf-8").splitlines():
+            k, sep, v = line.partition("=")
+            if sep:
+                cfg[k.strip()] = v.strip()
+    except OSError:
+        pass
+    return cfg
+
+
+def _cfg_version(cfg: dict[str, str]) -> str:
+    return cfg.get("version") or cfg.get("version_info") or ""
+
+
+def _cached_python_version(interp_cache: Path) -> str | None:
+    """Versión del intérprete que se usaría ahora (interp_cache.json vigente) o None si no se sabe."""
+    interp, _ = _resolve_python(interp_cache)
+    if not interp:
+        return None
+    try:
+        return json.loads(interp_cache.read_text(encoding="utf-8")).get("version") or None
+    except (OSError, ValueError):
+        return None
+
+
+def _template_valid(template: Path, key: str, interp_cache: Path) -> bool:
+    """
+    La plantilla vale si su .reqs_hash coincide con key (_venv_key), su intérprete base
+    sigue instalado y su versión de Python es la del intérprete cacheado (si hay uno
+    vigente con qué comparar).
+    """
+    try:
+        marker = (template / ".reqs_hash").read_text(encoding="utf-8").strip()
+    except OSError:
+        return False
+    cfg = _venv_cfg(template)
+    home = cfg.get("home")
+    if marker != key or not home or not os.path.isdir(home):
+        return False
+    want = _cached_python_version(interp_cache)
+    return want is None or _cfg_version(cfg) == want
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    # Hardlink si estamos en el mismo volumen; si no, copia (reflink si se puede)
+    try:
+        os.link(src, dst)
+    except OSError:
+        _cow_copy(src, dst)
+    return dst
+
+
+def _venv_python(venv_dir: Path) -> tuple[Path, list[str]]:
+    pybin = venv_dir / "Scripts" / "python.exe"
+    if not pybin.exists():
+        pybin = venv_dir / "bin" / "python"
+    return pybin, [str(pybin), "-m", "pip"]
+
+
+def _project_files(proj: Path) -> set[str]:
+    """Nombres de archivos (no carpetas) de proj con un solo scandir, en vez de un stat por archivo."""
+    with os.scandir(proj) as it:
+        return {e.name for e in it if e.is_file()}
 
 
 def _detect_root_with_app_py(root: Path) -> Path:
-    if (root / "app.py").exists():
-        return root
-    for p in root.iterdir():
-        if p.is_dir() and (p / "app.py").exists():
-            return p
+    subdirs: list[str] = []
+    with os.scandir(root) as it:
+        for e in it:
+            if e.name == "app.py" and e.is_file():
+                return root
+            if e.is_dir():
+                subdirs.append(e.path)
+    for d in subdirs:
+        if "app.py" in _project_files(Path(d)):
+            return Path(d)
     return root
 
 
 # ===================== IMPLEMENTACIÓN ROBUSTA DE venv =====================
 
-def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
+def _bootstrap_pip(interp: list[str], pybin: Path, wheel_dir: Path, log_cb) -> bool:
+    """
+    Instala pip/wheel/setuptools en un venv creado con --without-pip usando wheels
+    cacheadas en wheel_dir (se descargan una vez con el pip del intérprete base).
+    Si no hay wheels utilizables, recurre a ensurepip.
+    """
+    wheels = sorted(wheel_dir.glob("pip-*.whl"))
+    if not wheels:
+        wheel_dir.mkdir(parents=True, exist_ok=True)
+        _run(
+            interp + ["-m", "pip", "download", "--only-binary", ":all:", "-d", str(wheel_dir)]
+            + ["pip", "wheel", "setuptools"],
+            None, None, log_cb,
+        )
+        wheels = sorted(wheel_dir.glob("pip-*.whl"))
+    if wheels:
+        # pip puede ejecutarse directamente desde su propia wheel
+        code = _run(
+            [str(pybin), f"{wheels[-1]}/pip", "install", "--no-index", "--find-links", str(wheel_dir)]
+            + ["pip", "wheel", "setuptools"],
+            None, None, log_cb,
+        )
+        if code == 0:
+            return True
+    _emit(log_cb, "Aviso: no se pudo usar la caché de wheels de pip; uso ensurepip.")
+    return _run([str(pybin), "-m", "ensurepip", "--upgrade", "--default-pip"], None, None, log_cb) == 0
+
+
+def _resolve_python(cache_file: Path) -> tuple[list[str] | None, str]:
+    """
+    Intérprete cacheado en disco: (comando_o_None, marcador). El marcador es un hash
+    de PATH + mtime de py.exe; si cambia, la entrada cacheada deja de valer.
+    """
+    h = hashlib.sha256(os.environ.get("PATH", "").encode("utf-8"))
+    py = shutil.which("py")
+    if py:
+        h.update(str(os.stat(py).st_mtime_ns).encode())
+    marker = h.hexdigest()
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, marker
+    interp = data.get("interp")
+    if data.get("marker") != marker or not interp:
+        return None, marker
+    # Si es una ruta absoluta, basta con comprobar que sigue existiendo
+    if os.path.isabs(interp[0]) and not os.path.exists(interp[0]):
+        return None, marker
+    return interp, marker
+
+
+def _create_venv(
+    target_dir: Path, log_cb, pip_wheels: Path | None = None, interp_cache: Path | None = None
+) -> tuple[Path, list[str]]:
     """
     Busca un intérprete de Python 3.10–3.12 y crea un venv.
     Orden de búsqueda (Windows):
@@ -78,9 +938,11 @@ def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
       3) where python / where py
       4) rutas típicas (AppData/Program Files)
     En otros OS: which python3.12/3.11/3.10/python3/python.
+    Con pip_wheels el venv se crea --without-pip y pip se instala desde esas wheels
+    (evita que ensurepip desempaquete e instale pip en cada venv).
+    Con interp_cache se reutiliza el intérprete de la última búsqueda sin volver a sondear.
     Devuelve: (ruta_python_del_venv, comando_pip_del_venv)
     """
-    import re
     from shutil import which
 
     def _try_probe(cmd: list[str]) -> bool:
@@ -91,12 +953,47 @@ def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
         except Exception:
             return False
 
+    def _make_venv(interp: list[str]) -> tuple[Path, list[str]] | None:
+        venv_args = ["--without-pip"] if pip_wheels else []
+        code = _run(interp + ["-m", "venv"] + venv_args + [str(target_dir)], None, None, log_cb)
+        if code != 0:
+            return None
+        pybin, pip_cmd = _venv_python(target_dir)
+        if pip_wheels and not _bootstrap_pip(interp, pybin, pip_wheels, log_cb):
+            raise RuntimeError("No se pudo instalar pip en el entorno virtual.")
+        return pybin, pip_cmd
+
+    def _save_interp(interp: list[str]):
+        # La versión del venv recién creado es la que _template_valid exige a las plantillas
+        if not interp_cache:
+            return
+        version = _cfg_version(_venv_cfg(target_dir))
+        try:
+            interp_cache.write_text(
+                json.dumps({"marker": marker, "interp": interp, "version": version}), encoding="utf-8"
+            )
+        except OSError:
+            pass
+
+    marker = ""
+    if interp_cache:
+        cached, marker = _resolve_python(interp_cache)
+        if cached:
+            _emit(log_cb, f"Usando intérprete (caché): {' '.join(cached)}")
+            made = _make_venv(cached)
+            if made:
+                _save_interp(cached)
+                return made
+            _emit(log_cb, "El intérprete cacheado falló; se vuelve a buscar.")
+
     candidates: list[list[str]] = []
 
     # 1) py -0p
     if which("py"):
         try:
-            out = subprocess.check_output(["py", "-0p"], text=True, stderr=subprocess.STDOUT)
+            out = subprocess.check_output(
+                ["py", "-0p"], text=True, stderr=subprocess.STDOUT, **_popen_kwargs()
+            )
             for line in out.splitlines():
                 m = re.search(r"(\d\.\d+).*(python\.exe)", line, re.I)
                 if m:
@@ -114,7 +1011,9 @@ def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
     if os.name == "nt":
         for exe in ("python", "py"):
             try:
-                out = subprocess.check_output(["where", exe], text=True, stderr=subprocess.STDOUT)
+                out = subprocess.check_output(
+                    ["where", exe], text=True, stderr=subprocess.STDOUT, **_popen_kwargs()
+                )
                 for line in out.splitlines():
                     p = line.strip()
                     if p.lower().endswith("python.exe"):
@@ -168,12 +1067,10 @@ def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
         if not _try_probe(interp):
             continue
         _emit(log_cb, f"Usando intérprete: {' '.join(interp)}")
-        code = _run(interp + ["-m", "venv", str(target_dir)], None, None, log_cb)
-        if code == 0:
-            pybin = target_dir / "Scripts" / "python.exe"
-            if not pybin.exists():
-                pybin = target_dir / "bin" / "python"
-            return pybin, [str(pybin), "-m", "pip"]
+        made = _make_venv(interp)
+        if made:
+            _save_interp(interp)
+            return made
 
     _emit(log_cb, "No se encontró Python 3.10–3.12 en el sistema o no está en PATH/launcher.")
     _emit(log_cb, "Instala Python desde https://www.python.org/downloads/windows/ con:")
@@ -184,42 +1081,96 @@ def _create_venv(target_dir: Path, log_cb) -> tuple[Path, list[str]]:
 # =================== FIN IMPLEMENTACIÓN venv ===================
 
 
+def _install_deps(proj: Path, runner: _VenvRunner, opts: BuildOptions, log_cb) -> bool:
+    """Instala herramientas + requirements en UNA llamada a pip (un solo resolver)."""
+    req = proj / "requirements.txt"
+    reqs = ["-r", str(req)] if req.exists() else []
+    if not reqs:
+        _emit(log_cb, "Aviso: no hay requirements.txt; continuo con stdlib.")
+    code = runner.call(
+        "pip",
+        ["install", "--upgrade", "--cache-dir", runner.env["PIP_CACHE_DIR"]]
+        + ["pip", "wheel", "setuptools", PYINSTALLER_REQ]
+        + reqs,
+    )
+    return code == 0
+
+
+def _prepare_venv(proj: Path, opts: BuildOptions, log_cb) -> _VenvRunner:
+    """
+    Deja listo proj/.venv_build con dependencias instaladas y devuelve su runner
+    (el llamador debe cerrarlo).
+    Si existe una plantilla para el mismo requirements.txt se clona con hardlinks;
+    si no, se crea el venv, se instalan dependencias y se guarda como plantilla.
+    """
+    venv_dir = proj / ".venv_build"
+    _fast_rmtree(venv_dir)
+    root = _cache_root(opts)
+    key = _venv_key(proj)  # requirements.txt se lee una sola vez
+    template = root / "venvs" / key[:16]
+
+    if template.is_dir():
+        if _template_valid(template, key, root / "interp_cache.json"):
+            _emit(log_cb, f"requirements cache hit: reutilizando venv {template}")
+            shutil.copytree(template, venv_dir, symlinks=True, copy_function=_link_or_copy)
+            return _venv_runner(_venv_python(venv_dir)[0], opts, log_cb)
+        _emit(log_cb, "El venv en caché no coincide (requirements/Python); se reconstruye.")
+
+    pybin, _ = _create_venv(
+        venv_dir, log_cb, root / "pip-bootstrap", root / "interp_cache.json"
+    )
+    runner = _venv_runner(pybin, opts, log_cb)
+    ok = _install_deps(proj, runner, opts, log_cb)
+    # pip deja un audit hook permanente en el intérprete que marca (y con pip ≥ 26.3 bloquea)
+    # cualquier import posterior: PyInstaller tiene que correr en un proceso nuevo.
+    # El runner se relanza solo en la siguiente llamada.
+    runner.close()
+    if not ok:
+        return runner  # algo falló: no cacheamos un venv incompleto
+    (venv_dir / ".reqs_hash").write_text(key, encoding="utf-8")
+
+    # Persistimos la plantilla sólo tras una instalación correcta (copia + rename atómico)
+    staging = template.with_name(template.name + ".tmp")
+    _fast_rmtree(staging)
+    try:
+        shutil.copytree(venv_dir, staging, symlinks=True, copy_function=_link_or_copy)
+        _fast_rmtree(template)  # plantilla obsoleta, si la había
+        os.replace(staging, template)
+    except OSError as e:
+        _emit(log_cb, f"Aviso: no se pudo guardar el venv en caché: {e}")
+        _fast_rmtree(staging)
+    return runner
+
+
 def _pyinstaller_onedir(
-    proj: Path, pybin: Path, pip_cmd: list[str], opts: BuildOptions, log_cb
+    proj: Path, runner: _VenvRunner, opts: BuildOptions, log_cb, identity: Path | None = None
 ) -> Path:
+    names = _project_files(proj)
     dist = proj / "dist_out"
-    build = proj / "build_out"
-    shutil.rmtree(dist, ignore_errors=True)
-    shutil.rmtree(build, ignore_errors=True)
-
-    _run(pip_cmd + ["install", "--upgrade", "pip", "wheel", "setuptools"], None, None, log_cb)
-    _run(pip_cmd + ["install", "pyinstaller"], None, None, log_cb)
-
-    req = proj / "requirements.txt"
-    if req.exists():
-        _run(pip_cmd + ["install", "-r", str(req)], None, None, log_cb)
-    else:
-        _emit(log_cb, "Aviso: no hay requirements.txt; continuo con stdlib.")
+    # NO se borra: caché incremental de PyInstaller
+    build = _pyi_workpath(proj, names, opts, identity or proj)
+    _fast_rmtree(dist)
 
     base = [
-        str(pybin),
-        "-m",
-        "PyInstaller",
         "--noconfirm",
-        "--clean",
         "--distpath",
         str(dist),
         "--workpath",
         str(build),
     ]
-    # Siempre ONEDIR (no añadimos --onefile)
+    # ONEDIR por defecto (explícito); --onefile sólo si se pide (y sin .spec, que ya lo decide)
+    if "pyinstaller.spec" in names:
+        if opts.onefile:
+            _emit(log_cb, "Aviso: hay pyinstaller.spec; el modo onefile lo define el .spec.")
+    else:
+        base.append("--onefile" if opts.onefile else "--onedir")
     if opts.noconsole:
         base.append("--noconsole")
     if opts.icon_path:
         base += ["--icon", opts.icon_path]
 
-    add_data = proj / "build_add_data.txt"
-    if add_data.exists():
+    if "build_add_data.txt" in names:
+        add_data = proj / "build_add_data.txt"
         for line in add_data.read_text(encoding="utf-8").splitlines():
             line = line.strip()
             if line and ";" in line:
@@ -227,70 +1178,302 @@ def _pyinstaller_onedir(
 
     target = (
         str(proj / "pyinstaller.spec")
-        if (proj / "pyinstaller.spec").exists()
+        if "pyinstaller.spec" in names
         else str(proj / "app.py")
     )
-    code = _run(base + [target], cwd=proj, env=None, log_cb=log_cb)
+    code = runner.call("pyinstaller", base + [target], cwd=proj)
     if code != 0:
         raise RuntimeError("PyInstaller falló; revisa los logs.")
 
+    if opts.onefile and "pyinstaller.spec" not in names:
+        # onefile: dist_out contiene sólo el ejecutable; devolvemos la carpeta completa
+        if not any(dist.iterdir()):
+            raise FileNotFoundError("No se encontró el ejecutable onefile en dist")
+        return dist
+
     out_dir = dist / "app"  # onedir estándar
     if not out_dir.exists():
         raise FileNotFoundError("No se encontró carpeta onedir en dist/app")
     return out_dir
 
 
-def _copy_and_zip_onedir(onedir: Path, dest_parent: Path, base_name: str, log_cb) -> Path:
-    out_dir = dest_parent / f"{base_name}_onedir"
-    if out_dir.exists():
-        shutil.rmtree(out_dir, ignore_errors=True)
-    shutil.copytree(onedir, out_dir)
+_SMOKE_TIMEOUT = 10.0  # s; una app GUI no termina sola: si sigue viva tras esto, arrancó
+
+
+def _smoke_test(built: Path, log_cb):
+    """
+    Prueba rápida post-build sobre una copia desechable de la salida ya entregada: lo que
+    la app escriba junto a sí (logs, config…) no acaba en la carpeta ni en el ZIP.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="compile_smoke_"))
+    try:
+        copy = tmp / built.name
+        shutil.copytree(built, copy, symlinks=True, copy_function=_cow_copy)
+        _smoke_run(copy, log_cb)
+    except OSError as e:
+        _emit(log_cb, f"Prueba rápida: no se pudo preparar la copia ({e})")
+    finally:
+        _fast_rmtree(tmp, background=True)
+
+
+def _smoke_run(out: Path, log_cb):
+    """
+    Lanza el ejecutable de `out` con --version y registra cuánto tarda.
+    Sólo informa; nunca hace fallar el build.
+    """
+    exe = out / ("app.exe" if os.name == "nt" else "app")
+    if not exe.is_file():
+        _emit(log_cb, f"Prueba rápida omitida: no hay {exe.name} en {out}")
+        return
+    _emit(log_cb, f"$ {exe} --version")
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [str(exe), "--version"],
+            cwd=str(out),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=_SMOKE_TIMEOUT,
+            **_popen_kwargs(),
+        )
+    except subprocess.TimeoutExpired:
+        _emit(log_cb, f"Prueba rápida: sigue en ejecución tras {_SMOKE_TIMEOUT:.0f} s (arrancó; detenido)")
+        return
+    except OSError as e:
+        _emit(log_cb, f"Prueba rápida: no se pudo ejecutar ({e})")
+        return
+    elapsed = time.perf_counter() - t0
+    for line in proc.stdout.decode("utf-8", "replace").splitlines()[-20:]:
+        _emit(log_cb, line.rstrip())
+    status = "OK" if proc.returncode == 0 else f"código {proc.returncode}"
+    _emit(log_cb, f"Prueba rápida: {status} en {elapsed:.2f} s")
+
+
+def _compress_type(name: str) -> int:
+    return zipfile.ZIP_STORED if name.lower().endswith(_STORED_EXTS) else zipfile.ZIP_DEFLATED
+
+
+def _deflate_file(path: str, level: int) -> tuple[int, int, bytes, int]:
+    """Contenido de un archivo listo para el zip: (crc, tamaño, datos, compress_type)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if _compress_type(path) == zipfile.ZIP_STORED:
+        return zlib.crc32(data), len(data), data, zipfile.ZIP_STORED
+    # Deflate crudo (sin cabecera zlib). ISA-L sólo tiene niveles 0-3: por encima, zlib
+    if _zlib_fast is not None and level <= 3:
+        co = _zlib_fast.compressobj(level, _zlib_fast.DEFLATED, -15)
+    else:
+        co = zlib.compressobj(level, zlib.DEFLATED, -15)
+    comp = co.compress(data) + co.flush()
+    return zlib.crc32(data), len(data), comp, zipfile.ZIP_DEFLATED
+
+
+def _zip_dir(src_dir: Path, out_zip: Path, compresslevel: int, jobs: int | None = None):
+    """
+    Zip del onedir con deflate en paralelo: los archivos se agrupan en tareas de ~4 MiB,
+    cada hilo comprime su grupo (zlib/isal liberan el GIL) y las entradas ya comprimidas
+    se escriben en serie, en orden. Archivos enormes van por ZipFile.write (streaming).
+    """
+    entries: list[tuple[str, str, int]] = []
+    empty_dirs: list[tuple[str, str]] = []  # como make_archive, las carpetas vacías también van
+    for root, dirs, files in os.walk(src_dir):
+        if not dirs and not files and root != str(src_dir):
+            empty_dirs.append((root, os.path.relpath(root, src_dir)))
+        for f in files:
+            fp = os.path.join(root, f)
+            entries.append((fp, os.path.relpath(fp, src_dir), os.path.getsize(fp)))
+
+    groups: list[list[tuple[str, str, int]]] = []
+    current: list[tuple[str, str, int]] = []
+    acc = 0
+    for e in entries:
+        if e[2] > _ZIP_STREAM_BYTES:
+            groups.append([e])
+            continue
+        if current and acc + e[2] > _CHUNK_BYTES:
+            groups.append(current)
+            current, acc = [], 0
+        current.append(e)
+        acc += e[2]
+    if current:
+        groups.append(current)
 
-    out_zip = dest_parent / f"{base_name}_onedir.zip"
-    if out_zip.exists():
-        out_zip.unlink()
-    shutil.make_archive(out_zip.with_suffix("").as_posix(), "zip", root_dir=out_dir)
-    _emit(log_cb, f"Salida onedir: {out_dir}")
-    _emit(log_cb, f"Zip: {out_zip}")
-    return out_dir  # devolvemos carpeta principal
+    def _compress_group(group):
+        if len(group) == 1 and group[0][2] > _ZIP_STREAM_BYTES:
+            return None  # se escribe en streaming desde el hilo principal
+        return [_deflate_file(fp, compresslevel) for fp, _, _ in group]
+
+    workers = max(1, jobs or min(8, os.cpu_count() or 4))
+    with zipfile.ZipFile(
+        out_zip, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel, allowZip64=True
+    ) as z, ThreadPoolExecutor(max_workers=workers) as ex:
+        for root, arc in empty_dirs:
+            z.write(root, arc)  # entrada de carpeta ("arc/")
+        # Ventana acotada por bytes en vuelo (no por nº de tareas: un grupo puede ser un solo
+        # archivo de hasta 64 MiB) para no tener medio zip en memoria con muchos núcleos
+        def _group_bytes(g) -> int:
+            return 0 if len(g) == 1 and g[0][2] > _ZIP_STREAM_BYTES else sum(e[2] for e in g)
+
+        pending = deque()
+        inflight = 0
+        it = iter(groups)
+        nxt = next(it, None)
+
+        def _fill():
+            nonlocal nxt, inflight
+            while nxt is not None and (not pending or (
+                len(pending) < workers * 2 and inflight + _group_bytes(nxt) <= _ZIP_INFLIGHT_BYTES
+            )):
+                inflight += _group_bytes(nxt)
+                pending.append((nxt, ex.submit(_compress_group, nxt)))
+                nxt = next(it, None)
+
+        _fill()
+        while pending:
+            group, fut = pending.popleft()
+            results = fut.result()
+            inflight -= _group_bytes(group)
+            if results is None:
+                fp, arc, _ = group[0]
+                z.write(fp, arc, compress_type=_compress_type(fp))
+            else:
+                for (fp, arc, _), (crc, size, payload, ctype) in zip(group, results):
+                    _zip_write_raw(z, fp, arc, crc, size, payload, ctype)
+            del results
+            _fill()
+
+
+def _zip_write_raw(
+    z: zipfile.ZipFile, fp: str, arcname: str, crc: int, size: int, payload: bytes, ctype: int
+):
+    """Añade al zip una entrada ya comprimida (cabecera local + datos); ZipFile escribe el directorio central."""
+    zinfo = zipfile.ZipInfo.from_file(fp, arcname)
+    zinfo.compress_type = ctype
+    zinfo.CRC = crc
+    zinfo.file_size = size
+    zinfo.compress_size = len(payload)
+    zinfo.header_offset = z.fp.tell()
+    zip64 = size > zipfile.ZIP64_LIMIT or len(payload) > zipfile.ZIP64_LIMIT
+    z.fp.write(zinfo.FileHeader(zip64))
+    z.fp.write(payload)
+    z.filelist.append(zinfo)
+    z.NameToInfo[zinfo.filename] = zinfo
+    z.start_dir = z.fp.tell()
+    z._didModify = True
+
+
+_FICLONE = 0x40049409  # ioctl de Linux para clonar un archivo (reflink, Btrfs/XFS)
+
+
+def _cow_copy(src: str, dst: str) -> str:
+    """
+    Copia un archivo clonando extents (copy-on-write) si el sistema de archivos lo soporta:
+    FICLONE en Linux, clonefile() en macOS. Si no, shutil.copy2.
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass
+    elif sys.platform == "darwin":
+        import ctypes
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0:
+                return dst
+        except (OSError, AttributeError):
+            pass
+    return shutil.copy2(src, dst)
+
+
+def _copy_and_zip_onedir(
+    onedir: Path, dest_parent: Path, base_name: str, opts: BuildOptions, log_cb
+) -> Path:
+    """
+    Entrega la salida según opts.produce_dir / opts.produce_zip:
+    sólo carpeta → mover; sólo zip → comprimir directamente desde onedir; ambos → mover y zip.
+    Devuelve la carpeta (o el zip si no se pidió carpeta).
+    """
+    suffix = "onefile" if opts.onefile else "onedir"
+    out_dir = dest_parent / f"{base_name}_{suffix}"
+    out_zip = dest_parent / f"{base_name}_{suffix}.zip"
+
+    if opts.produce_dir:
+        if out_dir.exists():
+            _fast_rmtree(out_dir)
+        # onedir es temporal (dist_out se borra en cada build): mover = rename si es el mismo volumen;
+        # entre volúmenes se copia con reflink cuando el FS lo permite
+        shutil.move(str(onedir), str(out_dir), copy_function=_cow_copy)
+        _emit(log_cb, f"Salida {suffix}: {out_dir}")
+
+    if opts.produce_zip:
+        if out_zip.exists():
+            out_zip.unlink()
+        _zip_dir(out_dir if opts.produce_dir else onedir, out_zip, opts.compresslevel, opts.jobs)
+        _emit(log_cb, f"Zip: {out_zip}")
+
+    return out_dir if opts.produce_dir else out_zip
+
+
+def _check_outputs(opts: BuildOptions):
+    if not (opts.produce_dir or opts.produce_zip):
+        raise ValueError("Elige al menos una salida: carpeta y/o ZIP.")
 
 
 # ----------------- API PÚBLICA -----------------
 
 def build_from_zip(zip_path: Path, opts: BuildOptions, log_cb=None, phase_cb=None) -> Path:
     """Compila desde un ZIP. Guarda onedir/zip en la MISMA carpeta del ZIP."""
+    _check_outputs(opts)
     phase = phase_cb or (lambda p: None)
     phase(5)
-    tmp_root = Path(tempfile.mkdtemp(prefix="compile_zip_"))
+    # Carpeta fija por ZIP (no mkdtemp): proyecto y venv caen siempre en las mismas rutas y
+    # PyInstaller puede reutilizar su Analysis en el workpath persistente
+    zip_key = hashlib.sha256(str(zip_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    tmp_root = Path(_best_tmp_base()) / f"compile_zip_{zip_key}"
+    _fast_rmtree(tmp_root)  # restos de un build interrumpido
     try:
         proj_root = tmp_root / "proj"
         proj_root.mkdir(parents=True, exist_ok=True)
-        _safe_unzip(zip_path, proj_root)
+        big_member = opts.parallel_member_threshold if opts.use_pugz else None
+        _safe_unzip(zip_path, proj_root, opts.jobs, big_member, log_cb, opts.use_uring)
         src = _detect_root_with_app_py(proj_root)
         if not (src / "app.py").exists():
             raise FileNotFoundError("Falta app.py en el proyecto.")
 
         phase(25)
-        venv_dir = src / ".venv_build"
-        shutil.rmtree(venv_dir, ignore_errors=True)
-        pybin, pip_cmd = _create_venv(venv_dir, log_cb)
+        runner = _prepare_venv(src, opts, log_cb)
 
         phase(60)
-        onedir = _pyinstaller_onedir(src, pybin, pip_cmd, opts, log_cb)
+        try:
+            onedir = _pyinstaller_onedir(src, runner, opts, log_cb, identity=zip_path)
+        finally:
+            runner.close()
 
         phase(85)
         dest_parent = zip_path.parent
         base_name = zip_path.stem
-        out_dir = _copy_and_zip_onedir(onedir, dest_parent, base_name, log_cb)
+        out_dir = _copy_and_zip_onedir(onedir, dest_parent, base_name, opts, log_cb)
+        if opts.smoke_test:
+            _smoke_test(out_dir if opts.produce_dir else onedir, log_cb)
 
         phase(100)
         return out_dir
     finally:
-        shutil.rmtree(tmp_root, ignore_errors=True)
+        # La salida vive junto al ZIP (fuera de tmp_root): borramos en segundo plano
+        _fast_rmtree(tmp_root, background=True)
 
 
 def build_from_dir(proj_dir: Path, opts: BuildOptions, log_cb=None, phase_cb=None) -> Path:
     """Compila desde una CARPETA. Guarda onedir/zip en ESA MISMA carpeta."""
+    _check_outputs(opts)
     phase = phase_cb or (lambda p: None)
     phase(10)
 
@@ -299,18 +1482,25 @@ def build_from_dir(proj_dir: Path, opts: BuildOptions, log_cb=None, phase_cb=Non
         raise FileNotFoundError("Falta app.py en la carpeta.")
 
     phase(30)
-    venv_dir = src / ".venv_build"
-    shutil.rmtree(venv_dir, ignore_errors=True)
-    pybin, pip_cmd = _create_venv(venv_dir, log_cb)
+    runner = _prepare_venv(src, opts, log_cb)
 
     phase(70)
-    onedir = _pyinstaller_onedir(src, pybin, pip_cmd, opts, log_cb)
+    try:
+        onedir = _pyinstaller_onedir(src, runner, opts, log_cb)
+    finally:
+        runner.close()
 
     phase(90)
     dest_parent = proj_dir
     base_name = proj_dir.name
-    out_dir = _copy_and_zip_onedir(onedir, dest_parent, base_name, log_cb)
+    out_dir = _copy_and_zip_onedir(onedir, dest_parent, base_name, opts, log_cb)
+    if opts.smoke_test:
+        _smoke_test(out_dir if opts.produce_dir else onedir, log_cb)
 
     phase(100)
     return out_dir
 
+
+def build_project_from_zip(zip_file, tmp_base, opts: BuildOptions, **kw) -> Path:
+    """Compatibilidad con la API antigua; tmp_base se ignora (la carpeta temporal se elige sola)."""
+    return build_from_zip(Path(zip_file), opts, **kw)
@@ -3,26 +3,160 @@
 # icono opcional y salida automática en la carpeta del ZIP o de la carpeta de proyecto.
 
 from pathlib import Path
+import errno
+import importlib.metadata
+import os
 import sys
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING
 
 from PySide6 import QtCore, QtGui, QtWidgets
-import qdarkstyle
 
-from builder_core import (
-    build_from_zip, build_from_dir, BuildOptions, BuildSignals
-)
+# qdarkstyle y builder_core (zipfile, subprocess, hashlib…) se importan al usarlos: la
+# ventana se pinta antes de cargarlos. qdarkstyle se importa siempre (sus recursos traen los
+# iconos del QSS); con el QSS en caché sólo se evita generarlo.
+if TYPE_CHECKING:
+    from builder_core import BuildOptions, BuildSignals
 
 APP_TITLE = "🧱 Compilador .exe (PyInstaller)"
 FOOTER_TEXT = "© 2025 Gabriel Golker"
 
 
-class DropList(QtWidgets.QListWidget):
-    """Área para soltar archivos/carpeta; sólo muestra, la copia se hace en build."""
+def _load_statx():
+    """statx() de glibc (Linux, glibc ≥ 2.28) o None si no está disponible."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+
+        fn = ctypes.CDLL("libc.so.6", use_errno=True).statx
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.c_void_p]
+    fn.restype = ctypes.c_int
+    return fn, ctypes.create_string_buffer(256), ctypes.get_errno
+
+
+_STATX = _load_statx()
+_AT_FDCWD = -100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_TYPE = 0x0001
+
+
+def exists_fast(path: str) -> bool:
+    """
+    Como os.path.exists, pero en Linux usa statx(AT_STATX_DONT_SYNC, STATX_TYPE): sólo pide
+    el tipo de archivo y no fuerza sincronizar atributos. Fuera de Linux, os.path.exists.
+    Usar sólo desde el hilo de la GUI (el buffer de statx es compartido).
+    """
+    if _STATX is None:
+        return os.path.exists(path)
+    fn, buf, get_errno = _STATX
+    if fn(_AT_FDCWD, os.fsencode(path), _AT_STATX_DONT_SYNC, _STATX_TYPE, buf) == 0:
+        return True
+    if get_errno() == errno.ENOSYS:
+        return os.path.exists(path)
+    return False
+
+
+def _existing_paths(paths: list[str]) -> list[str]:
+    """
+    Filtra las rutas que existen. Las que comparten carpeta (arrastre múltiple desde el
+    explorador) se resuelven con un solo scandir del padre, cacheado por carpeta; las
+    sueltas con un stat. Mantiene el orden y descarta duplicados.
+    """
+    by_parent: dict[str, list[str]] = {}
+    for p in dict.fromkeys(paths):
+        by_parent.setdefault(os.path.dirname(p), []).append(p)
+
+    listing: dict[str, set[str]] = {}  # carpeta → nombres existentes (vida: este drop)
+    for parent, group in by_parent.items():
+        if len(group) < 4:
+            continue
+        try:
+            with os.scandir(parent) as it:
+                listing[parent] = {e.name for e in it if e.is_dir() or e.is_file()}
+        except OSError:
+            pass
+
+    out = []
+    for p in dict.fromkeys(paths):
+        names = listing.get(os.path.dirname(p))
+        if names is not None:
+            if os.path.basename(p) in names:
+                out.append(p)
+        elif exists_fast(p):
+            out.append(p)
+    return out
+
+
+def _apply_dark_palette(app: QtWidgets.QApplication):
+    """Color de enlaces del tema oscuro en la paleta de la app (el QSS no cubre QPalette.Link)."""
+    from qdarkstyle import DarkPalette
+
+    pal = app.palette()
+    pal.setColor(QtGui.QPalette.Normal, QtGui.QPalette.Link, QtGui.QColor(DarkPalette.COLOR_ACCENT_3))
+    app.setPalette(pal)
+
+
+def _dark_stylesheet(app: QtWidgets.QApplication) -> str:
+    """
+    QSS de qdarkstyle cacheado en disco (carpeta de caché del usuario, una entrada por versión
+    de qdarkstyle). Sólo se cachea el texto del QSS: en un acierto se importan los recursos de
+    qdarkstyle (iconos :/qss_icons) en lugar de generarlo; si no, se genera y se guarda.
+    La paleta se ajusta siempre con _apply_dark_palette.
+    """
+    try:
+        ver = importlib.metadata.version("qdarkstyle")
+    except importlib.metadata.PackageNotFoundError:
+        ver = None  # p.ej. congelado sin metadatos: sin caché
+    base = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.CacheLocation)
+    cache = Path(base) / f"qdarkstyle-{ver}-pyside6.qss" if ver and base else None
+
+    if cache is not None:
+        try:
+            qss = cache.read_text(encoding="utf-8")
+        except OSError:
+            qss = None
+        if qss:
+            os.environ.setdefault("QT_API", "pyside6")
+            from qdarkstyle.dark import darkstyle_rc  # noqa: F401  (registra los recursos)
+
+            _apply_dark_palette(app)
+            return qss
+
+    import qdarkstyle
+
+    qss = qdarkstyle.load_stylesheet(qt_api="pyside6")
+    _apply_dark_palette(app)
+    if cache is not None:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(qss, encoding="utf-8")
+            os.replace(tmp, cache)
+        except OSError:
+            pass
+    return qss
+
+
+class DropList(QtWidgets.QListView):
+    """
+    Área para soltar archivos/carpeta; sólo muestra, la copia se hace en build.
+    Las rutas viven en un QStringListModel (lista de str), sin un QListWidgetItem por entrada.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._model = QtCore.QStringListModel(self)
+        self.setModel(self._model)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.setUniformItemSizes(True)
         self.setAcceptDrops(True)
         self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)  # <-- FIX
-        self.setAlternatingRowColors(True)
+        # Sin filas alternas: con el QSS de qdarkstyle cada fila se resolvería por selector al pintar
+        self.setAlternatingRowColors(False)
 
     def dragEnterEvent(self, e: QtGui.QDragEnterEvent):
         if e.mimeData().hasUrls():
@@ -38,42 +172,120 @@ class DropList(QtWidgets.QListWidget):
 
     def dropEvent(self, e: QtGui.QDropEvent):
         if e.mimeData().hasUrls():
-            for url in e.mimeData().urls():
-                p = Path(url.toLocalFile())
-                if p.exists():
-                    self.addItem(str(p))
+            local = [str(Path(url.toLocalFile())) for url in e.mimeData().urls() if url.isLocalFile()]
+            paths = _existing_paths(local)
+            if paths:
+                # Un solo reset del modelo con la lista completa
+                self._model.setStringList(self._model.stringList() + paths)
             e.acceptProposedAction()
         else:
             super().dropEvent(e)
 
 
-class BuildWorker(QtCore.QThread):
-    def __init__(self, mode_zip: bool, path: Path, opts: BuildOptions, parent=None):
+class Toast(QtWidgets.QFrame):
+    """Aviso no bloqueante en la esquina inferior derecha de la ventana; aparece y se va con fundido."""
+    def __init__(self, parent: QtWidgets.QMainWindow):
         super().__init__(parent)
+        self.setFrameShape(QtWidgets.QFrame.StyledPanel)
+        self.setAutoFillBackground(True)
+        self._label = QtWidgets.QLabel(self)
+        self._label.setWordWrap(True)
+        lay = QtWidgets.QHBoxLayout(self)
+        lay.setContentsMargins(12, 8, 12, 8)
+        lay.addWidget(self._label)
+
+        self._opacity = QtWidgets.QGraphicsOpacityEffect(self)
+        self.setGraphicsEffect(self._opacity)
+        self._anim = QtCore.QPropertyAnimation(self._opacity, b"opacity", self)
+        self._anim.setDuration(200)
+        self._anim.finished.connect(self._anim_done)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(lambda: self._fade(0.0))
+
+        parent.installEventFilter(self)  # recolocar al redimensionar la ventana
+        self.hide()
+
+    def show_message(self, text: str, msecs: int = 5000):
+        self._label.setText(text)
+        self.setMaximumWidth(max(240, self.parentWidget().width() // 2))
+        self.adjustSize()
+        self._reposition()
+        self.show()
+        self.raise_()
+        self._fade(1.0)
+        self._timer.start(msecs)
+
+    def _fade(self, end: float):
+        self._anim.stop()
+        self._anim.setStartValue(self._opacity.opacity())
+        self._anim.setEndValue(end)
+        self._anim.start()
+
+    def _anim_done(self):
+        if self._anim.endValue() == 0.0:
+            self.hide()
+
+    def _reposition(self):
+        win = self.parentWidget()
+        m = 16
+        bottom = win.statusBar().geometry().top() if win.statusBar().isVisible() else win.height()
+        self.move(win.width() - self.width() - m, bottom - self.height() - m)
+
+    def eventFilter(self, obj, e):
+        if e.type() == QtCore.QEvent.Resize and self.isVisible():
+            self._reposition()
+        return False
+
+    def mousePressEvent(self, e: QtGui.QMouseEvent):
+        self._timer.stop()
+        self._fade(0.0)
+
+
+class BuildRunnable(QtCore.QRunnable):
+    """Build en un hilo del QThreadPool global (sin crear un QThread por build)."""
+    def __init__(self, mode_zip: bool, path: Path, opts: "BuildOptions", signals: "BuildSignals", log_cb):
+        super().__init__()
         self.mode_zip = mode_zip
         self.path = path
         self.opts = opts
-        self.signals = BuildSignals()
+        self.signals = signals  # compartido con MainWindow (conectado una sola vez)
+        self.log_cb = log_cb  # thread-safe; la GUI vacía los logs en bloque con un QTimer
+
+    def _progress_cb(self):
+        """phase_cb que sólo emite si el valor sube ≥1 o pasaron 33 ms (y siempre el 100)."""
+        last = [-1, 0.0]  # valor emitido, instante
+
+        def emit(p):
+            now = time.monotonic()
+            if p - last[0] >= 1 or p >= 100 or now - last[1] > 0.033:
+                last[0], last[1] = p, now
+                self.signals.progress.emit(int(p))
+
+        return emit
 
     def run(self):
         try:
+            from builder_core import build_from_dir, build_from_zip
+
+            phase_cb = self._progress_cb()
             if self.mode_zip:
                 out_dir = build_from_zip(
                     zip_path=self.path,
                     opts=self.opts,
-                    log_cb=lambda t: self.signals.log.emit(t),
-                    phase_cb=lambda p: self.signals.progress.emit(p),
+                    log_cb=self.log_cb,
+                    phase_cb=phase_cb,
                 )
             else:
                 out_dir = build_from_dir(
                     proj_dir=self.path,
                     opts=self.opts,
-                    log_cb=lambda t: self.signals.log.emit(t),
-                    phase_cb=lambda p: self.signals.progress.emit(p),
+                    log_cb=self.log_cb,
+                    phase_cb=phase_cb,
                 )
-            self.signals.done.emit(True, str(out_dir), "")
+            self.signals.done.emit(True, out_dir, "")
         except Exception as e:
-            self.signals.done.emit(False, "", str(e))
+            self.signals.done.emit(False, None, str(e))
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -81,8 +293,12 @@ class MainWindow(QtWidgets.QMainWindow):
         super().__init__()
         self.setWindowTitle(APP_TITLE)
         self.setMinimumSize(980, 680)
-        self._icon_path: Path | None = None
+        self._icon_str: str | None = None  # ruta ya convertida, la que va a BuildOptions
+        self._icon: QtGui.QIcon | None = None  # decodificado una vez por selección
         self._last_output_dir: Path | None = None
+        self._output_is_dir = False
+        self._last_output_url: QtCore.QUrl | None = None  # lo que abre "Abrir carpeta de salida"
+        self._output_checked = 0.0  # monotonic de la última vez que se vio existir la salida
 
         # Tabs: ZIP / Carpeta
         tabs = QtWidgets.QTabWidget()
@@ -119,6 +335,16 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Controles comunes
         self.noconsole_chk = QtWidgets.QCheckBox("Ocultar consola (--noconsole)")
+        self.smoke_chk = QtWidgets.QCheckBox("Ejecutar prueba rápida post-build")
+        self.smoke_chk.setToolTip("Lanza el ejecutable generado con --version y muestra en el log cuánto tarda en arrancar.")
+        self.out_dir_chk = QtWidgets.QCheckBox("Generar carpeta")
+        self.out_dir_chk.setChecked(True)
+        self.out_zip_chk = QtWidgets.QCheckBox("Generar ZIP")
+        self.out_zip_chk.setChecked(True)
+        out_row = QtWidgets.QHBoxLayout()
+        out_row.addWidget(self.out_dir_chk)
+        out_row.addWidget(self.out_zip_chk)
+        out_row.addStretch(1)
         self.icon_btn = QtWidgets.QPushButton("Elegir icono (.ico)…")
         self.icon_lbl = QtWidgets.QLabel("Sin icono")
         icon_row = QtWidgets.QHBoxLayout()
@@ -134,6 +360,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log.setReadOnly(True)
         mono = QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont)
         self.log.setFont(mono)
+        self.log.setMaximumBlockCount(5000)  # builds enormes: no crecer sin límite
+        self._log_cursor = self.log.textCursor()
 
         self.open_out_btn = QtWidgets.QPushButton("Abrir carpeta de salida")
         self.open_out_btn.setEnabled(False)
@@ -152,6 +380,8 @@ class MainWindow(QtWidgets.QMainWindow):
         v.addWidget(title)
         v.addWidget(tabs, stretch=0)
         v.addWidget(self.noconsole_chk)
+        v.addWidget(self.smoke_chk)
+        v.addLayout(out_row)
         v.addLayout(icon_row)
         v.addWidget(QtWidgets.QLabel("Logs"))
         v.addWidget(self.log, stretch=1)
@@ -168,7 +398,12 @@ class MainWindow(QtWidgets.QMainWindow):
         # Estado
         self._zip_path: Path | None = None
         self._proj_dir: Path | None = None
-        self._worker: BuildWorker | None = None
+        self._building = False
+        # Logs del worker: se encolan bajo lock y un QTimer (~30 Hz) los vuelca de una vez
+        self._log_buf: deque[str] = deque()
+        self._log_lock = threading.Lock()
+        self._log_timer = QtCore.QTimer(self)
+        self._log_timer.setInterval(33)
 
         # Conexiones
         self.zip_pick_btn.clicked.connect(self.pick_zip)
@@ -176,8 +411,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.icon_btn.clicked.connect(self.pick_icon)
         self.start_btn.clicked.connect(self.start_build)
         self.open_out_btn.clicked.connect(self.open_output_folder)
+        self._log_timer.timeout.connect(self._flush_logs)
+
+        # Señales del build: se crean en el primer build (import diferido de builder_core)
+        self.signals: "BuildSignals | None" = None
 
         self.statusBar().showMessage("Listo.")
+        self.toast = Toast(self)
 
     # -------- acciones --------
 
@@ -202,15 +442,23 @@ class MainWindow(QtWidgets.QMainWindow):
     def pick_icon(self):
         p, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Seleccionar icono .ico", "", "Icono (*.ico)")
         if p:
-            self._icon_path = Path(p)
-            self.icon_lbl.setText(str(self._icon_path))
-            self.setWindowIcon(QtGui.QIcon(str(self._icon_path)))
+            p = str(Path(p))
+            if p == self._icon_str:
+                return  # mismo icono: nada que recargar
+            self._icon_str = p
+            self._icon = QtGui.QIcon(p)
+            self.icon_lbl.setText(p)
+            self.setWindowIcon(self._icon)
 
     def start_build(self):
+        if self._building:
+            return
         self.log.clear()
         self.progress.setValue(0)
         self.open_out_btn.setEnabled(False)
         self._last_output_dir = None
+        self._last_output_url = None
+        self._output_checked = 0.0
 
         if self._zip_path:
             mode_zip = True
@@ -222,57 +470,113 @@ class MainWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Falta fuente", "Selecciona un ZIP o una carpeta de proyecto.")
             return
 
+        if not (self.out_dir_chk.isChecked() or self.out_zip_chk.isChecked()):
+            QtWidgets.QMessageBox.warning(self, "Falta salida", "Marca al menos carpeta o ZIP.")
+            return
+
+        from builder_core import BuildOptions, BuildSignals
+
+        if self.signals is None:
+            # Una instancia para toda la sesión, emitida desde el hilo worker
+            self.signals = BuildSignals()
+            self.signals.progress.connect(self.progress.setValue, QtCore.Qt.QueuedConnection)
+            self.signals.done.connect(self.build_done, QtCore.Qt.QueuedConnection)
+
         opts = BuildOptions(
             noconsole=self.noconsole_chk.isChecked(),
-            icon_path=str(self._icon_path) if self._icon_path else None
+            icon_path=self._icon_str,
+            onefile=False,  # siempre ONEDIR: arranca sin autoextraerse a un temporal
+            produce_dir=self.out_dir_chk.isChecked(),
+            produce_zip=self.out_zip_chk.isChecked(),
+            jobs=os.cpu_count(),
+            smoke_test=self.smoke_chk.isChecked(),
         )
 
-        self._worker = BuildWorker(mode_zip, path, opts, self)
-        self._worker.signals.log.connect(self.append_log)
-        self._worker.signals.progress.connect(self.progress.setValue)
-        self._worker.signals.done.connect(self.build_done)
+        runnable = BuildRunnable(mode_zip, path, opts, self.signals, self._queue_log)
+        self._building = True
 
         self.toggle_inputs(False)
         self.statusBar().showMessage("Compilando…")
-        self._worker.start()
+        self._log_timer.start()
+        QtCore.QThreadPool.globalInstance().start(runnable)
 
-    def append_log(self, text: str):
-        self.log.appendPlainText(text)
-        self.log.verticalScrollBar().setValue(self.log.verticalScrollBar().maximum())
+    def _queue_log(self, text: str):
+        # Llamado desde el hilo del worker
+        with self._log_lock:
+            self._log_buf.append(text)
+
+    def _flush_logs(self):
+        with self._log_lock:
+            if not self._log_buf:
+                return
+            batch, self._log_buf = self._log_buf, deque()
+        self.append_log("\n".join(batch))
 
-    def build_done(self, ok: bool, out_path: str, err: str):
+    def append_log(self, text: str):
+        sb = self.log.verticalScrollBar()
+        at_bottom = sb.value() >= sb.maximum() - 4  # sólo autoscroll si el usuario ya estaba abajo
+        self._log_cursor.movePosition(QtGui.QTextCursor.End)
+        self._log_cursor.insertText(text + "\n")
+        if at_bottom:
+            sb.setValue(sb.maximum())
+
+    def build_done(self, ok: bool, out_path: Path | None, err: str):
+        self._building = False
+        self._log_timer.stop()
+        self._flush_logs()
         self.toggle_inputs(True)
         if ok:
             self.progress.setValue(100)
-            self._last_output_dir = Path(out_path)
+            self._last_output_dir = out_path
+            # Recién producida: existe. open_output_folder no vuelve a mirar el disco hasta que caduque
+            self._output_is_dir = out_path.is_dir()
+            self._output_checked = time.monotonic()
+            # Si sólo se generó el ZIP, se abre la carpeta que lo contiene
+            target = out_path if self._output_is_dir else out_path.parent
+            self._last_output_url = QtCore.QUrl.fromLocalFile(str(target))
             self.statusBar().showMessage("Build finalizado")
             self.append_log("\n=== Build finalizado ===")
             self.append_log(f"Salida: {self._last_output_dir}")
             self.open_out_btn.setEnabled(True)
-            QtWidgets.QMessageBox.information(self, "Éxito", f"Build listo en:\n{self._last_output_dir}\nY el ZIP al lado.")
+            extra = "\nY el ZIP al lado." if self._output_is_dir and self.out_zip_chk.isChecked() else ""
+            # Sin diálogo modal: la ventana sigue respondiendo y se puede lanzar otro build ya
+            self.toast.show_message(f"Build listo en:\n{self._last_output_dir}{extra}")
         else:
             self.statusBar().showMessage("Error en build")
             self.append_log("\n=== ERROR ===")
             self.append_log(err)
             QtWidgets.QMessageBox.critical(self, "Error", err)
 
+    _OUTPUT_STALE_S = 5.0  # pasado esto desde el build (o la última comprobación), volver a mirar
+
     def open_output_folder(self):
-        if self._last_output_dir and self._last_output_dir.exists():
-            QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(str(self._last_output_dir)))
+        if not self._last_output_dir or self._last_output_url is None:
+            return
+        now = time.monotonic()
+        if now - self._output_checked > self._OUTPUT_STALE_S:
+            if not exists_fast(str(self._last_output_dir)):
+                self.statusBar().showMessage("La salida ya no existe.")
+                return
+            self._output_checked = now
+        QtGui.QDesktopServices.openUrl(self._last_output_url)
 
     def toggle_inputs(self, enabled: bool):
         self.zip_pick_btn.setEnabled(enabled)
         self.dir_pick_btn.setEnabled(enabled)
         self.icon_btn.setEnabled(enabled)
         self.noconsole_chk.setEnabled(enabled)
+        self.smoke_chk.setEnabled(enabled)
+        self.out_dir_chk.setEnabled(enabled)
+        self.out_zip_chk.setEnabled(enabled)
         self.start_btn.setEnabled(enabled)
 
 
 def main():
     app = QtWidgets.QApplication(sys.argv)
-    app.setStyleSheet(qdarkstyle.load_stylesheet(qt_api="pyside6"))
     w = MainWindow()
     w.show()
+    # El tema se aplica en la primera vuelta del event loop: la ventana aparece sin esperarlo
+    QtCore.QTimer.singleShot(0, lambda: app.setStyleSheet(_dark_stylesheet(app)))
     sys.exit(app.exec())
 
 